@@ -1,117 +1,89 @@
 """
-Run with python astar.py <board filename> <algorithm>
+Run with python astar.py <board filename> <algorithm> [--no-animate]
 """
 
-import os
+import heapq
+import itertools
 import sys
 import time
+from collections import deque
 
+ANIMATE = True
 ANIMATION_STEP_TIME = 0.2
-EXPLORED_CELL = 'X'
-RETRACED_PATH_CELL = 'O'
-OPENED_CELL = '*'
+EXPLORED_CELL = ord('X')
+RETRACED_PATH_CELL = ord('O')
+OPENED_CELL = ord('*')
+BLOCKED_CELL = ord('#')
+START_CELL = ord('A')
+GOAL_CELL = ord('B')
+NEIGHBOUR_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# Per cell search states, see SearchState.cells
+UNSEEN, OPEN, CLOSED = 0, 1, 2
+
+
+class SearchState(object):
+    """ Everything a single run of the search keeps track of """
+    __slots__ = ('board', 'width', 'node_class', 'goal', 'heuristics', 'fifo',
+                 'openset', 'nodes', 'cells', 'counter')
+
+    def __init__(self, board, Node):
+        self.board = board
+        self.width = len(board[0])
+        self.node_class = Node
+        self.goal = find_node(board, GOAL_CELL)
+        self.heuristics = build_heuristics(board, *self.goal)
+        # The node type decides how the open set is ordered
+        self.fifo = Node.fifo
+        self.openset = deque() if self.fifo else []
+        self.nodes = {}
+        # UNSEEN, OPEN or CLOSED for every cell index
+        self.cells = bytearray(len(board) * self.width)
+        self.counter = itertools.count()
 
 
 class BaseNode(object):
-    board = None
-    goal = None
-    openset = {}
-    closedset = []
+    __slots__ = ('x', 'y', 'val', 'parent', '_g', '_h', '_f')
+    fifo = False
+    use_heuristic = True
 
-    def __init__(self, x, y, parent=None):
+    def __init__(self, state, x, y, parent=None):
         self.x = x
         self.y = y
-        self.val = self.board[self.y][self.x]
-        self.parent = parent
-
-    def open(self):
-        self.openset[self] = self.f_value
-
-    def close(self):
-        del self.openset[self]
-        self.closedset.append(self)
-
-    @classmethod
-    def get_similar(cls, node):
-        for elem in cls.openset:
-            if elem == node:
-                return elem
-        for elem in cls.closedset:
-            if elem == node:
-                return elem
-        return None
-
-    @classmethod
-    def show_opens(cls):
-        for node in cls.openset:
-            cls.board[node.y][node.x] = OPENED_CELL
-
-    @property
-    def heuristic(self):
-        return abs(self.goal.x - self.x) + abs(self.goal.y - self.y)
-
-    @property
-    def f_value(self):
-        return self.heuristic + self.g_value
+        self.val = state.board[y][x]
+        # The parent is kept as its cell index, y * width + x, or -1
+        if parent is not None:
+            self.parent = parent.y * state.width + parent.x
+            self._g = parent._g + self.move_cost
+        else:
+            self.parent = -1
+            self._g = self.move_cost
+        if self.use_heuristic:
+            self._h = state.heuristics[y][x]
+        else:
+            self._h = 0
+        self._f = self._h + self._g
 
     @property
     def move_cost(self):
         raise NotImplementedError("Move cost not implemented")
 
-    @property
-    def g_value(self):
-        if self.parent is not None:
-            return self.move_cost + self.parent.g_value
-        return self.move_cost
-
-    def validate_node(self, x, y):
-        return 0 <= y < len(self.board) and \
-            0 <= x < len(self.board[0])
-
-    @classmethod
-    def get_next_node(cls):
-        return min(cls.openset, key=cls.openset.get)
-
-    @property
-    def children(self):
-        output = [(self.x + 1, self.y), (self.x - 1, self.y),
-                  (self.x, self.y + 1), (self.x, self.y - 1)]
-        for pair in [p for p in output if self.validate_node(*p)]:
-            node = self.__class__(*pair, parent=self)
-            if not node.is_blocked:
-                yield node
-
-    def animate_path(self):
-        parent = self.parent
-        while parent is not None:
-            self.board[parent.y][parent.x] = RETRACED_PATH_CELL
-            print_board(self.board)
-            time.sleep(ANIMATION_STEP_TIME)
-            parent = parent.parent
-
-    def __str__(self):
-        return '({}, {})'.format(self.x, self.y)
-
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
 
-    @property
-    def is_blocked(self):
-        return self.val == '#'
+class UnknownCellException(Exception):
+    pass
 
-    def __repr__(self):
-        return self.__str__()
 
-    def __hash__(self):
-        return self.x * 100 + self.y
+class MissingCellException(Exception):
+    pass
 
 
-class UnknownCellException(Exception):
+class NoPathException(Exception):
     pass
 
 
 class StandardNode(BaseNode):
     """ Standard A star without movement costs """
+    __slots__ = ()
+
     @property
     def move_cost(self):
         return 0
@@ -119,136 +91,197 @@ class StandardNode(BaseNode):
 
 class CellCostNode(BaseNode):
     """ Standard A star with movement cost """
+    __slots__ = ()
+    costs = {ord('w'): 100, ord('m'): 50, ord('f'): 10, ord('g'): 5,
+             ord('r'): 1, START_CELL: 0, GOAL_CELL: 0}
+
     @property
     def move_cost(self):
-        if self.val == 'w':
-            return 100
-        elif self.val == 'm':
-            return 50
-        elif self.val == 'f':
-            return 10
-        elif self.val == 'g':
-            return 5
-        elif self.val == 'r':
-            return 1
-        elif self.val in ('A', 'B'):
-            return 0
-        raise UnknownCellException("Can't handle cell with value {}"
-                                   .format(self.val))
+        try:
+            return self.costs[self.val]
+        except KeyError:
+            raise UnknownCellException("Can't handle cell with value {}"
+                                       .format(chr(self.val)))
 
 
 class StandardDijkstraNode(BaseNode):
     """ Dijkstra without movement cost """
+    __slots__ = ()
+    use_heuristic = False
 
     @property
     def move_cost(self):
         return 1
 
-    @property
-    def f_value(self):
-        return self.g_value
-
 
 class StandardBFSNode(BaseNode):
     """ BFS without movement cost """
-    openset = []
+    __slots__ = ()
+    fifo = True
 
     @property
     def move_cost(self):
         return 1
 
-    @classmethod
-    def get_next_node(cls):
-        return cls.openset[0]
 
-    def open(self):
-        self.openset.append(self)
+class CellCostBFSNode(CellCostNode):
+    """ BFS with cell cost """
+    __slots__ = ()
+    fifo = True
 
-    def close(self):
-        self.openset.remove(self)
-        self.closedset.append(self)
 
+class CellCostDijkstraNode(CellCostNode):
+    """ Dijkstra with cell cost """
+    __slots__ = ()
+    use_heuristic = False
 
-class CellCostBFSNode(CellCostNode):
-    """ BFS with cell cost """
-    openset = []
 
-    @classmethod
-    def get_next_node(cls):
-        return cls.openset[0]
+def open_node(state, node):
+    if state.fifo:
+        state.openset.append(node)
+    else:
+        heapq.heappush(state.openset, (node._f, next(state.counter), node))
+    index = node.y * state.width + node.x
+    state.nodes[index] = node
+    state.cells[index] = OPEN
 
-    def open(self):
-        self.openset.append(self)
 
-    def close(self):
-        self.openset.remove(self)
-        self.closedset.append(self)
+def reopen_node(state, node):
+    """ Requeue an open node after its f value dropped """
+    # FIFO order does not depend on cost. On the heap the old entry is
+    # left behind and skipped once the node is closed
+    if not state.fifo:
+        heapq.heappush(state.openset, (node._f, next(state.counter), node))
 
 
-class CellCostDijkstraNode(CellCostNode):
-    """ Dijkstra with cell cost """
-    @property
-    def f_value(self):
-        return self.g_value
+def close_node(state, node):
+    if state.fifo:
+        state.openset.popleft()
+    state.cells[node.y * state.width + node.x] = CLOSED
+
+
+def next_node(state):
+    openset = state.openset
+    if state.fifo:
+        if openset:
+            return openset[0]
+    else:
+        # Entries whose node has since been closed are stale, skip them
+        while openset:
+            node = openset[0][2]
+            if state.cells[node.y * state.width + node.x] != CLOSED:
+                return node
+            heapq.heappop(openset)
+    raise NoPathException("No path leads from A to B")
+
+
+def show_opens(state):
+    for index, node in state.nodes.items():
+        if state.cells[index] == OPEN:
+            state.board[node.y][node.x] = OPENED_CELL
 
 
 def build_board(fname):
-    board = []
-    with open(fname) as infile:
-        for line in infile.readlines():
-            row = []
-            for c in line.rstrip():
-                row.append(c)
-            board.append(row)
-    return board
+    with open(fname, 'rb') as infile:
+        data = infile.read()
+    return [bytearray(line.rstrip()) for line in data.splitlines()]
 
 
 def print_board(board):
-    os.system('clear')
+    if ANIMATE:
+        # ANSI clear screen and cursor home, cheaper than spawning `clear`
+        sys.stdout.write('\x1b[2J\x1b[H')
     for row in board:
-        for node in row:
-            print node,
-        print
+        print ' '.join(chr(node) for node in row)
 
 
-def find_node(board, val, Node):
+def find_node(board, val):
+    """ Coordinates of the first cell holding val """
+    needle = bytearray((val,))
     for y, row in enumerate(board):
-        for x, node in enumerate(row):
-            if node == val:
-                return Node(x, y)
-    return -1, -1
+        x = row.find(needle)
+        if x != -1:
+            return x, y
+    raise MissingCellException("Board has no cell with value {}"
+                               .format(chr(val)))
+
 
+def build_heuristics(board, goal_x, goal_y):
+    """ Manhattan distance to the goal for every cell """
+    return [[abs(goal_x - x) + abs(goal_y - y) for x in range(len(row))]
+            for y, row in enumerate(board)]
 
-def astar(board, Node):
-    Node.goal = find_node(board, 'B', Node)
-    start = find_node(board, 'A', Node)
-    start.open()
+
+def animate_search(board, explored):
+    """ Replay the cells explored by the search, in order """
+    for x, y in explored:
+        board[y][x] = EXPLORED_CELL
+        if ANIMATE:
+            print_board(board)
+            time.sleep(ANIMATION_STEP_TIME)
+
+
+def animate_path(state, node):
+    """ Mark the path leading to node by walking the parent indices """
+    board, width = state.board, state.width
+    index = node.parent
+    while index != -1:
+        board[index // width][index % width] = RETRACED_PATH_CELL
+        if ANIMATE:
+            print_board(board)
+            time.sleep(ANIMATION_STEP_TIME)
+        index = state.nodes[index].parent
+
+
+def astar(state):
+    """ Returns the goal node and the explored cells in order """
+    board, Node = state.board, state.node_class
+    open_node(state, Node(state, *find_node(board, START_CELL)))
+    # Bind everything the loop touches to locals, saving an attribute
+    # lookup on the state for every step
+    goal_x, goal_y = state.goal
+    nodes = state.nodes
+    cells = state.cells
+    height, width = len(board), state.width
+    explored = []
     while True:
-        print_board(board)
-        current = Node.get_next_node()
-        if current == Node.goal:
-            current.close()
-            current.animate_path()
-            return
-        for child in current.children:
-            if child not in Node.closedset:
-                if child not in Node.openset:
-                    child.open()
-                else:
-                    other = Node.get_similar(child)
-                    if current.g_value + child.move_cost < other.g_value:
-                        other.parent = current
-
-        current.close()
-        board[current.y][current.x] = EXPLORED_CELL
-        time.sleep(ANIMATION_STEP_TIME)
+        current = next_node(state)
+        if current.x == goal_x and current.y == goal_y:
+            close_node(state, current)
+            return current, explored
+        current_g = current._g
+        current_index = current.y * width + current.x
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            x, y = current.x + dx, current.y + dy
+            if not (0 <= x < width and 0 <= y < height):
+                continue
+            index = y * width + x
+            cell = cells[index]
+            if cell == CLOSED or board[y][x] == BLOCKED_CELL:
+                continue
+            # Only cells seen for the first time need a node of their own
+            if cell == UNSEEN:
+                open_node(state, Node(state, x, y, parent=current))
+            else:
+                other = nodes[index]
+                g = current_g + other.move_cost
+                if g < other._g:
+                    other.parent = current_index
+                    other._g = g
+                    other._f = other._h + g
+                    reopen_node(state, other)
+
+        close_node(state, current)
+        explored.append((current.x, current.y))
 
 
 def main(fname, Node):
     board = build_board(fname)
-    Node.board = board
-    astar(board, Node)
-    Node.show_opens()
+    state = SearchState(board, Node)
+    goal, explored = astar(state)
+    animate_search(board, explored)
+    animate_path(state, goal)
+    show_opens(state)
     print_board(board)
 
 
@@ -256,7 +289,9 @@ if __name__ == '__main__':
     """
     Based on arguments, decidede what board and algorithm to use
     """
-    fname, alg = sys.argv[1:]
+    fname, alg = sys.argv[1:3]
+    if '--no-animate' in sys.argv[3:]:
+        ANIMATE = False
     if fname.split('-')[1] == '1':
         if alg == 'dijkstra':
             Node = StandardDijkstraNode